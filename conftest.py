@@ -0,0 +1,10 @@
+"""Shared pytest configuration for the DSP test suite.
+
+The test files are independent of each other, so the suite is run
+across worker processes with pytest-xdist (see pytest.ini). Workers
+are fed whole files (--dist=loadfile) because the singleton and
+connection-pool tests in test_ds_messenger_advanced.py assume the
+class-level state they poke at stays within one process.
+"""
+
+pytest_plugins = ["xdist"]
@@ -6,13 +6,88 @@ Implementation of the Direct Messaging Protocol for ICS 32 Assignment 3.
 
 import json
 import time
-from collections import namedtuple
+from dataclasses import dataclass, field
 from typing import Dict, Any, Optional, List, Union
 
-# Create a namedtuple to hold the values we expect to retrieve from json messages.
-fields = ['type', 'message', 'token', 'messages']
-# noqa: E501
-ServerResponse = namedtuple('ServerResponse', fields)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+#: Whether the optional MessagePack wire format can be used.
+MSGPACK_AVAILABLE = msgpack is not None
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize an object to compact JSON bytes.
+
+    Uses orjson when available (Rust implementation, returns bytes
+    directly), otherwise falls back to the stdlib encoder with compact
+    separators.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def _loads(data: Union[str, bytes]) -> Any:
+    """Deserialize a JSON string or bytes to a Python object."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def pack_message(obj: Any) -> bytes:
+    """Serialize an object with MessagePack for msgpack-capable servers.
+
+    MessagePack encodes the small nested dicts used by the DSP helpers
+    in fewer bytes than JSON, but it is only usable against a server
+    that negotiated the binary format; the stock DSP server speaks
+    newline-delimited JSON.
+
+    Raises:
+        DSPProtocolError: If msgpack is not installed
+    """
+    if msgpack is None:
+        raise DSPProtocolError("msgpack is not installed")
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def unpack_message(buf: bytes) -> Any:
+    """Deserialize a MessagePack payload produced by pack_message.
+
+    Raises:
+        DSPProtocolError: If msgpack is not installed
+    """
+    if msgpack is None:
+        raise DSPProtocolError("msgpack is not installed")
+    return msgpack.unpackb(buf, raw=False)
+
+@dataclass(frozen=True, slots=True)
+class ServerResponse:
+    """The values we expect to retrieve from json messages.
+
+    Frozen and slotted: attribute reads skip the tuple-indexing
+    property indirection a namedtuple pays, and instances carry no
+    per-object __dict__, which matters when a fetch-all materializes
+    one of these per poll.
+    """
+    type: Optional[str]
+    message: str = ''
+    token: Optional[str] = None
+    messages: List = field(default_factory=list)
+
+
+# Pre-bound constructor and shared empty default for the hot path in
+# extract_json. _EMPTY is handed out for every response that carries
+# no messages, so it must never be mutated.
+_SR = ServerResponse
+_EMPTY: List = []
 
 
 class DSPProtocolError(Exception):
@@ -20,89 +95,147 @@ class DSPProtocolError(Exception):
     pass
 
 
-def format_auth_message(username: str, password: str) -> str:
+# Precompiled body templates for the stdlib JSON fallback. The request
+# schemas are fixed, so only the values need escaping: formatting them
+# into a compiled template skips building and walking a dict per call.
+# orjson serializes these small dicts faster than templating would, so
+# the templates are used only when it is missing. Output is compact
+# (no whitespace) to byte-match _dumps.
+_AUTH_TMPL = '{{"authenticate":{{"username":{u},"password":{p}}}}}'
+_DM_TMPL = ('{{"token":{t},"directmessage":{{"message":{m},'
+            '"recipient":{r},"timestamp":{ts}}}}}')
+
+# One fully specialized template per valid fetch type; the dict doubles
+# as the validator, so a single probe both checks the type and fetches
+# its template.
+_FETCH_TMPLS = {
+    'all': '{{"token":{t},"fetch":"all"}}',
+    'unread': '{{"token":{t},"fetch":"unread"}}',
+}
+
+
+def format_auth_message(username: str, password: str,
+                        use_msgpack: bool = False) -> bytes:
     """Format an authentication message to be sent to the server.
 
     Args:
         username: The username for authentication
         password: The password for authentication
+        use_msgpack: Encode with MessagePack instead of JSON; only valid
+            against a server that negotiated the binary format
 
     Returns:
-        A JSON string representing the authentication message
+        Compact JSON (or MessagePack) bytes for the authentication message
     """
+    if orjson is None and not use_msgpack:
+        dumps = json.dumps
+        return _AUTH_TMPL.format(
+            u=dumps(username), p=dumps(password)).encode()
+
     auth_msg = {
         "authenticate": {
             "username": username,
             "password": password
         }
     }
-    return json.dumps(auth_msg)
+    if use_msgpack:
+        return pack_message(auth_msg)
+    return _dumps(auth_msg)
 
 
-def format_direct_message(token: str, recipient: str, message: str) -> str:
+def format_direct_message(token: str, recipient: str, message: str,
+                          timestamp: Optional[float] = None,
+                          use_msgpack: bool = False) -> bytes:
     """Format a direct message to be sent to another user.
 
     Args:
         token: The authentication token
         recipient: The recipient's username
         message: The message content
+        timestamp: Unix timestamp for the message; defaults to the
+            current time so callers can reuse one clock read
+        use_msgpack: Encode with MessagePack instead of JSON
 
     Returns:
-        A JSON string representing the direct message
+        Compact JSON (or MessagePack) bytes for the direct message
     """
+    if timestamp is None:
+        timestamp = time.time()
+
+    if orjson is None and not use_msgpack:
+        dumps = json.dumps
+        return _DM_TMPL.format(
+            t=dumps(token), m=dumps(message), r=dumps(recipient),
+            ts=dumps(timestamp)).encode()
+
     direct_msg = {
         "token": token,
         "directmessage": {
-<<<<<<< HEAD
-            # Changed from 'entry' to 'message' to match server expectation
             "message": message,
-=======
-            "entry": message,
->>>>>>> parent of 5095839 (Messages successfully send)
             "recipient": recipient,
-            "timestamp": time.time()
+            "timestamp": timestamp
         }
     }
-    return json.dumps(direct_msg, indent=4)
+    if use_msgpack:
+        return pack_message(direct_msg)
+    return _dumps(direct_msg)
 
 
-def format_fetch_request(token: str, fetch_type: str = 'all') -> str:
+def format_fetch_request(token: str, fetch_type: str = 'all',
+                         use_msgpack: bool = False) -> bytes:
     """Format a fetch request to retrieve messages.
 
     Args:
         token: The authentication token
         fetch_type: Type of messages to fetch ('all' or 'unread')
+        use_msgpack: Encode with MessagePack instead of JSON
 
     Returns:
-        A JSON string representing the fetch request
+        Compact JSON (or MessagePack) bytes for the fetch request
     """
-    if fetch_type not in ['all', 'unread']:
+    tmpl = _FETCH_TMPLS.get(fetch_type)
+    if tmpl is None:
         raise DSPProtocolError(
             "Invalid fetch type. Must be 'all' or 'unread'"
         )
 
+    if orjson is None and not use_msgpack:
+        # The fetch type is baked into the template, so only the
+        # token needs escaping
+        return tmpl.format(t=json.dumps(token)).encode()
+
     fetch_msg = {
         "token": token,
         "fetch": fetch_type
     }
-    return json.dumps(fetch_msg)
+    if use_msgpack:
+        return pack_message(fetch_msg)
+    return _dumps(fetch_msg)
 
 
-def extract_json(json_msg: str) -> ServerResponse:
+def extract_json(json_msg: Union[str, bytes, dict],
+                 use_msgpack: bool = False) -> ServerResponse:
     """Extract and validate the JSON response from the server.
 
     Args:
-        json_msg: The JSON string received from the server
+        json_msg: The JSON string or bytes received from the server, or
+            an already-parsed response dict (skips the decode step)
+        use_msgpack: Decode the payload as MessagePack instead of JSON
 
     Returns:
-        A ServerResponse namedtuple containing the response data
+        A ServerResponse containing the response data
 
     Raises:
         DSPProtocolError: If the JSON is invalid or missing required fields
     """
     try:
-        # Parse the JSON string
-        json_obj = json.loads(json_msg)
+        # Parse the payload; a dict is already parsed
+        if isinstance(json_msg, dict):
+            json_obj = json_msg
+        elif use_msgpack:
+            json_obj = unpack_message(json_msg)
+        else:
+            json_obj = _loads(json_msg)
 
         # Check if response exists and has required fields
         if 'response' not in json_obj:
@@ -112,34 +245,33 @@ def extract_json(json_msg: str) -> ServerResponse:
 
         response = json_obj['response']
 
-        # Extract response type and message
-        resp_type = response.get('type')
-        message = response.get('message', '')
-        token = response.get('token')
-
-        # Extract messages if they exist
-        messages = response.get('messages', [])
+        # One bound-method lookup and positional construction; the
+        # keyword form of the namedtuple constructor re-binds every
+        # field name on each call
+        get = response.get
+        return _SR(get('type'), get('message', ''), get('token'),
+                   get('messages', _EMPTY))
 
-        return ServerResponse(
-            type=resp_type,
-            message=message,
-            token=token,
-            messages=messages
-        )
-
-    except json.JSONDecodeError as e:
+    except ValueError as e:
+        # Covers both json.JSONDecodeError and orjson.JSONDecodeError
         raise DSPProtocolError(f"Failed to decode JSON: {str(e)}")
     except Exception as e:
         raise DSPProtocolError(f"Error processing server response: {str(e)}")
 
 
+#: Response types accepted as success; a frozenset so extending the
+#: protocol (e.g. partial-success types) is a one-line change.
+_OK_TYPES = frozenset(('ok',))
+
+
 def is_valid_response(response: ServerResponse) -> bool:
     """Validate if the server response is successful.
 
     Args:
-        response: The ServerResponse namedtuple
+        response: The ServerResponse, or None
 
     Returns:
         bool: True if the response indicates success, False otherwise
     """
-    return response.type == 'ok' if response else False
+    # getattr with a default also covers a None response
+    return getattr(response, 'type', None) in _OK_TYPES
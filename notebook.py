@@ -13,10 +13,17 @@
 # take a look at it if you are curious since we already
 # covered a bit of the JSON format in class.
 
+import bisect
 import json
 import time
+from array import array
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class NotebookFileError(Exception):
     """
@@ -33,37 +40,40 @@ class IncorrectNotebookError(Exception):
     pass
 
 
-class Diary(dict):
+class Diary:
     """
     The Diary class is responsible for working with individual user diaries.
     It currently supports two features: A timestamp property that is set upon
     instantiation and when the entry object is set and an entry property that
     stores the diary message.
     """
+    # Two fixed slots instead of subclassing dict: the old layout paid
+    # for a per-instance dict AND mirrored every attribute write into
+    # it. Serialization goes through to_dict() now.
+    __slots__ = ('_entry', '_timestamp')
+
     def __init__(self, entry: str = None, timestamp: float = 0):
-        self._timestamp = timestamp
         self.set_entry(entry)
+        if timestamp:
+            self._timestamp = timestamp
 
-        # Subclass dict to expose Diary properties for serialization
-        # Don't worry about this!
-        dict.__init__(self, entry=self._entry, timestamp=self._timestamp)
-    
     def set_entry(self, entry):
         self._entry = entry
         self._timestamp = time.time()
-        dict.__setitem__(self, 'entry', entry)
-        dict.__setitem__(self, 'timestamp', self._timestamp)
 
     def get_entry(self):
         return self._entry
     
     def set_time(self, time: float):
         self._timestamp = time
-        dict.__setitem__(self, 'timestamp', time)
     
     def get_timestamp(self):
         return self._timestamp
 
+    def to_dict(self) -> dict:
+        """Get the serializable form of the diary entry."""
+        return {'entry': self._entry, 'timestamp': self._timestamp}
+
     """
     The property method is used to support get and set capability for entry and 
     time values. When the value for entry is changed, or set, the timestamp field is 
@@ -89,6 +99,10 @@ class Notebook:
         self.password = password
         self.bio = bio
         self._diaries = []
+        # Parallel packed array of the diary timestamps. A C double per
+        # entry instead of a boxed float keeps time-window scans over a
+        # large notebook in a single contiguous buffer.
+        self._timestamps = array('d')
     
 
     def add_diary(self, diary: Diary):
@@ -98,6 +112,7 @@ class Notebook:
             diary (Diary): The diary entry to add.
         """
         self._diaries.append(diary)
+        self._timestamps.append(diary.timestamp)
 
 
     def del_diary(self, index: int) -> bool:
@@ -111,6 +126,7 @@ class Notebook:
         """
         if 0 <= index < len(self._diaries):
             del self._diaries[index]
+            del self._timestamps[index]
             return True
         return False
         
@@ -122,21 +138,50 @@ class Notebook:
         """
         return self._diaries
 
+    def filter_by_time(self, start: float, end: float) -> list:
+        """Get the diary entries whose timestamp falls in [start, end].
+
+        Diaries are timestamped as they are added, so the packed
+        timestamp array is in chronological order and the window can be
+        located by binary search instead of scanning every entry.
+
+        Args:
+            start (float): The earliest timestamp to include.
+            end (float): The latest timestamp to include.
+
+        Returns:
+            list: The diary entries inside the time window.
+        """
+        lo = bisect.bisect_left(self._timestamps, start)
+        hi = bisect.bisect_right(self._timestamps, end)
+        return self._diaries[lo:hi]
+
     def save(self, path: str) -> None:
         """Save the notebook to a file.
 
         Args:
             path (str): The path to save the notebook to.
         """
+        obj = {
+            'username': self.username,
+            'password': self.password,
+            'bio': self.bio,
+            'diaries': [d.to_dict() for d in self._diaries]
+        }
         try:
-            with open(path, 'w') as f:
-                json.dump({
-                    'username': self.username,
-                    'password': self.password,
-                    'bio': self.bio,
-                    'diaries': [dict(d) for d in self._diaries]
-                }, f, indent=4)
-        except Exception as e:
+            # Encode to bytes in one shot and write them directly;
+            # orjson skips the text-mode UTF-8 re-encode that json.dump
+            # performs on every chunk. Encode failures surface as
+            # TypeError/ValueError (orjson.JSONEncodeError subclasses
+            # TypeError), IO failures as OSError; anything else is a
+            # real bug and should propagate
+            if orjson is not None:
+                payload = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+            else:
+                payload = json.dumps(obj, indent=2).encode()
+            with open(path, 'wb') as f:
+                f.write(payload)
+        except (TypeError, ValueError, OSError) as e:
             raise NotebookFileError(f"Failed to save notebook: {str(e)}")
 
     def load(self, path: str) -> None:
@@ -152,20 +197,34 @@ class Notebook:
 
         Raises NotebookFileError, IncorrectNotebookError
         """
-        p = Path(path)
-
-        if p.exists() and p.suffix == '.json':
-            try:
-                f = open(p, 'r')
-                obj = json.load(f)
-                self.username = obj['username']
-                self.password = obj['password']
-                self.bio = obj['bio']
-                for diary_obj in obj['_diaries']:
-                    diary = Diary(diary_obj['entry'], diary_obj['timestamp'])
-                    self._diaries.append(diary)
-                f.close()
-            except Exception as ex:
-                raise IncorrectNotebookError(ex)
-        else:
-            raise NotebookFileError()
+        # A single open replaces the old stat-then-open pair: one
+        # syscall fewer and no window for the file to disappear between
+        # the existence check and the read
+        if Path(path).suffix != '.json':
+            raise NotebookFileError(f"Not a notebook file: {path}")
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError as e:
+            raise NotebookFileError(f"File not found: {path}") from e
+        except OSError as e:
+            raise NotebookFileError(
+                f"Failed to read notebook: {str(e)}") from e
+
+        try:
+            if orjson is not None:
+                obj = orjson.loads(data)
+            else:
+                obj = json.loads(data)
+            self.username = obj['username']
+            self.password = obj['password']
+            self.bio = obj['bio']
+            # Notebook files written before the save cleanup used the
+            # private attribute name as the key; accept both spellings
+            diaries = obj.get('diaries', obj.get('_diaries', []))
+            for diary_obj in diaries:
+                diary = Diary(diary_obj['entry'], diary_obj['timestamp'])
+                self._diaries.append(diary)
+                self._timestamps.append(diary.timestamp)
+        except Exception as ex:
+            raise IncorrectNotebookError(ex)
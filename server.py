@@ -3,20 +3,58 @@
 This module implements a server that handles user authentication, message passing,
 and user management for a direct messaging service.
 """
-import socket
+import asyncio
+import os
 import threading
 import json
+import queue
+from operator import itemgetter
 from pathlib import Path
 import sys
 from datetime import datetime
-import string
 import secrets
+import hashlib
+import uuid
+from urllib.parse import quote, unquote
+
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    """Serialize an object to compact JSON bytes.
+
+    Uses orjson when available (returns bytes directly), otherwise the
+    stdlib encoder with compact separators. users.json and every wire
+    response go through here, so this is the server's hottest helper.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def _loads(data):
+    """Deserialize JSON bytes or str to a Python object."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 # Configuration constants
 USERS_PATH = 'users.json'
+USERS_DIR_PATH = 'users'
 STORE_DIR_PATH = 'store'
 # Set to False to disable debug output
 DEBUG = True
+# Largest request the server will hand to the JSON parser
+MAX_MSG = 65536
 
 # Server data storage structure:
 # users.json contains user data with the following schema:
@@ -36,32 +74,94 @@ DEBUG = True
 
 
 def generate_token():
-    """Generate a random token in the format xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx.
-    
+    """Generate a random session token.
+
     Returns:
-        str: A randomly generated token string.
+        str: A UUID4 string in the familiar 8-4-4-4-12 format.
     """
-    return (
-        f'{_generate_random_string(8)}-{_generate_random_string(4)}-'
-        f'{_generate_random_string(4)}-{_generate_random_string(4)}-'
-        f'{_generate_random_string(12)}'
-    )
+    # One CSPRNG draw instead of the old 32 secrets.choice calls
+    return str(uuid.uuid4())
 
-def _generate_random_string(n: int) -> str:
-    """Generate a random alphanumeric string of specified length.
-    
-    Args:
-        n: The length of the string to generate.
-        
-    Returns:
-        str: A random alphanumeric string.
+
+def _hash_password(password: str) -> str:
+    """Hash a password for storage.
+
+    Uses bcrypt when available; without it the password is stored as-is
+    (the original behavior), so the server still runs in a bare
+    environment.
+    """
+    if bcrypt is None:
+        return password
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+# Memoized bcrypt checks, keyed on a SHA-256 digest of the candidate
+# rather than the plaintext itself so the cache never retains
+# passwords in memory. Cleared wholesale when full; re-auth storms
+# with the same credentials are the case worth caching, not breadth.
+_verify_cache: dict = {}
+_VERIFY_CACHE_MAX = 1024
+
+
+def _verify_password(stored: str, password: str) -> bool:
+    """Check a password against its stored form.
+
+    Legacy records hold the plaintext password, so anything without a
+    bcrypt prefix is compared with a constant-time equality check on
+    the encoded bytes (compare_digest rejects non-ASCII str). The
+    digest-keyed cache means a client that re-authenticates with the
+    same credentials does not pay the bcrypt work factor again.
     """
-    alphanums = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(alphanums) for _ in range(n))
+    if bcrypt is not None and stored.startswith('$2'):
+        candidate = password.encode()
+        key = (stored, hashlib.sha256(candidate).digest())
+        hit = _verify_cache.get(key)
+        if hit is None:
+            hit = bcrypt.checkpw(candidate, stored.encode())
+            if len(_verify_cache) >= _VERIFY_CACHE_MAX:
+                _verify_cache.clear()
+            _verify_cache[key] = hit
+        return hit
+    return secrets.compare_digest(stored.encode(), password.encode())
+
+
+# Pre-encoded frames for the fixed error messages: these are sent on
+# every malformed or unauthorized request, so encode them once at
+# import instead of per response
+_CANNED_ERRORS = {
+    msg: _dumps({'response': {'type': 'error', 'message': msg}}) + b'\r\n'
+    for msg in (
+        'Incorrectly formatted JSON message.',
+        'Incorrectly formatted authenticate command.',
+        'Extra fields provided to authenticate command object.',
+        'Missing required fields for authenticate command object.',
+        'User already authenticated on the active session.',
+        'Missing token.',
+        'Incorrectly formatted directmessage command.',
+        'Incorrect fields provided to directmessage command object.',
+        'Missing required fields for directmessage command.',
+        'Unable to send direct message',
+        'Invalid user token.',
+        'Invalid argument for fetch field.',
+        'Invalid command.',
+    )
+}
 
 # Global lock for thread-safe access to users file
 users_file_lock = threading.Lock()
 
+# Per-user locks so a direct message only serializes with operations on
+# the same accounts, not with every other client. The meta-lock is held
+# just long enough to look up or create a user's lock.
+_user_locks_guard = threading.Lock()
+_user_locks = {}
+
+
+def _user_lock(username: str) -> threading.Lock:
+    """Return the lock guarding a single user's storage file."""
+    with _user_locks_guard:
+        return _user_locks.setdefault(username, threading.Lock())
+
 
 class DSUServer:
     """Server class for handling direct messaging functionality.
@@ -81,54 +181,51 @@ class DSUServer:
         self.port = port
         # Dictionary mapping tokens to usernames for active sessions
         self.sessions = {}
-        # List of connected client sockets
-        self.clients = []
+        # Connected client writers; a set so disconnect cleanup is
+        # O(1) instead of scanning a list
+        self.clients = set()
+        # In-memory user records: the server owns its storage files, so
+        # every read is served from this dict and disk is only touched
+        # by the append-only mutation log and periodic compaction
+        self._users = {}
+        # Resolve the storage paths once; _user_path runs on every
+        # request and should not rebuild the directory prefix each time
+        self._store_path = Path('.') / STORE_DIR_PATH
+        self._users_dir = self._store_path / USERS_DIR_PATH
+        self._log_path = self._store_path / 'users.log'
+        # Compaction parks the outgoing log segment here until every
+        # shard is durable; see _compact
+        self._old_log_path = self._store_path / 'users.log.old'
+        self._write_q = queue.Queue()
+        # Held while a mutation is applied and enqueued, and by
+        # compaction while it rotates the log and snapshots the
+        # records, so the log segment being retired can never hold an
+        # entry whose effect is not in the snapshot (or vice versa)
+        self._log_fence = threading.Lock()
+        self._writer_thread = None
+        self._compact_interval = 30.0
+        self._compact_timer = None
+        # Command dispatch table: O(1) routing instead of an if/elif
+        # membership chain re-run per request
+        self._handlers = {
+            'authenticate': self._handle_authenticate,
+            'directmessage': self._handle_directmessage,
+            'fetch': self._handle_fetch
+        }
     
-    def start_server(self):
-        """Start the server and listen for incoming connections."""
-        # Create the store directory if it doesn't exist
-        store_dir = Path(STORE_DIR_PATH)
-        store_dir.mkdir(exist_ok=True)
-        
-        # Create users.json if it doesn't exist
-        users_path = store_dir / USERS_PATH
-        if not users_path.exists():
-            with users_file_lock:
-                with users_path.open('w') as f:
-                    json.dump({}, f)
-        
-        # Create and configure the server socket
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(5)
-        
-        print(f"Server started on {self.host}:{self.port}")
-        
-        try:
-            while True:
-                client_socket, client_address = self.server_socket.accept()
-                print(f"New connection from {client_address}")
-                client_thread = threading.Thread(
-                    target=self.handle_client,
-                    args=(client_socket, client_address)
-                )
-                client_thread.daemon = True
-                client_thread.start()
-        except KeyboardInterrupt:
-            print("Shutting down server...")
-        finally:
-            self.server_socket.close()
-    
-    def handle_client(self, client_socket, client_address):
+    async def handle_client(self, reader, writer):
         """Handle requests from a single client connection.
         
         Args:
-            client_socket: The socket object for the client connection
-            client_address: The address of the client (host, port)
+            reader: The asyncio stream reader for the connection
+            writer: The asyncio stream writer for the connection
         """
         current_user_token = None
-        self.clients.append(client_socket)
+        # Username bound to this connection once authenticate succeeds;
+        # saves the sessions-dict lookups on every subsequent request
+        current_user = None
+        client_address = writer.get_extra_info('peername') or ('?', 0)
+        self.clients.add(writer)
         client_info = f"{client_address[0]}:{client_address[1]}"
         
         if DEBUG:
@@ -136,7 +233,17 @@ class DSUServer:
             
         try:
             while True:
-                data = client_socket.recv(4096)
+                # One message = one newline-delimited line; the stream
+                # reader buffers, so large requests never truncate.
+                # Lines beyond the reader's limit raise instead of
+                # parsing: reject and drop the connection
+                try:
+                    data = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(_CANNED_ERRORS[
+                        'Incorrectly formatted JSON message.'])
+                    await writer.drain()
+                    break
                 if not data:
                     if DEBUG:
                         print(f"Client {client_info} disconnected")
@@ -146,129 +253,54 @@ class DSUServer:
                     print(f"Message received by server: {repr(data)}")
                 direct_message_read = False
                 direct_message_sent = False
-                msg = data.decode().strip() 
+                msg = data.strip()
                 if not msg:
                     if DEBUG:
                         print("Connection closed.")
                     break
+                if len(msg) > MAX_MSG or msg[0:1] != b'{':
+                    # Reject oversized or trivially malformed input
+                    # before paying for the parser (or its exception
+                    # unwind) at all
+                    writer.write(_CANNED_ERRORS[
+                        'Incorrectly formatted JSON message.'])
+                    await writer.drain()
+                    continue
                 try:
-                    command = json.loads(msg.strip())
-                except json.JSONDecodeError:
+                    command = _loads(msg)
+                except ValueError:
                     message = 'Incorrectly formatted JSON message.'
                     status = 'error'
                 else: 
-                    message = ""
-                    status = "error"
-                    
-                    if 'authenticate' in command:
-                        
-                        if len(command) != 1: 
-                            status = "error"
-                            message = "Incorrectly formatted authenticate command."
-                        elif len(command['authenticate']) > 2:
-                            status = "error"
-                            message = "Extra fields provided to authenticate command object."
-                        elif not all(field in command['authenticate'] for field in ['username', 'password']):
-                            status = "error"
-                            message = "Missing required fields for authenticate command object."
-                        elif current_user_token:
-                            status = "error"
-                            message = "User already authenticated on the active session."
-                        else:
-                            ##execute authenticate command
-                            
-                            uname = command['authenticate']['username']
-                            password = command['authenticate']['password']
-                            
-                            
-                            fetched_user = self._get_or_create_new_user(uname, password)
-
-                            current_user_token = generate_token()
-                            if not fetched_user:
-                                message = f'Welcome to ICS32 Distributed Social, {uname}!'
-                                status = 'ok'
-                                self.sessions[current_user_token] = uname
-
-                                
-                            else:
-                                if fetched_user['password'] != password:
-                                    status = "error"
-                                    message = f'Incorrect password for the user {uname}'
-                                    current_user_token = None
-                                    
-                                else:
-                                    status = "ok"
-                                    message = f'Welcome back, {uname}!'
-                                    self.sessions[current_user_token] = uname
-                    
-                    ###direct message handling
-                    elif 'directmessage' in command:
-                        
-                        args = command['directmessage']
-
-                        if 'token' not in command:
-                            message = 'Missing token.'
-                            status = 'error'
-                        elif len(command) != 2:
-                            message = "Incorrectly formatted directmessage command."
-                            status = 'error'
-                        elif args not in ['all', 'unread'] and not (isinstance(args, dict) and len(args) == 3):
-                            message = "Incorrect fields provided to directmessage command object."
-                            status = 'error'
-                        elif isinstance(args, dict) and not all(field in command['directmessage'] for field in ['entry', 'timestamp', 'recipient']):
-                            message = "Missing required fields for directmessage command."
-                            status = 'error'
-                        else:
-                            token = command['token']
-                            recipient = args['recipient']
-                            #timestamp = args['timestamp']
-                            timestamp = str((datetime.now().timestamp()))
-                            entry = args['entry']
-                            if token == current_user_token and token in self.sessions:
-                                current_user = self.sessions[token]
-                                direct_message_sent = True
-                                    
-                                if self._send_message(entry,current_user, recipient, timestamp):
-                                    message = f'Direct message sent'
-                                    status = 'ok'
-                                else:
-                                    message = f'Unable to send direct message'
-                                    status = 'error'
-                            else:
-                                message = 'Invalid user token.'
-                                status = 'error'
-                            
-                    elif 'fetch' in command:
-                        args = command['fetch']
-                        token = command['token']
-                        if args == 'all':
-                            if token == current_user_token and token in self.sessions:
-                                current_user = self.sessions[token]
-                                direct_message_read = True
-                                message = self._read_all_messages(current_user)
-                                status = 'ok'
-                            else:
-                                message = f'Invalid user token.'
-                                status = 'error'
-                        elif args == 'unread':
-                            if token == current_user_token and token in self.sessions:
-                                current_user = self.sessions[token]
-                                direct_message_read = True
-                                message = self._read_unread_messages(current_user)
-                                status = 'ok'
-                            else:
-                                message = f'Invalid user token.'
-                                status = 'error'
-
-                        else:
-                            message = 'Invalid argument for fetch field.'
-                            status = 'error'
-
-                    else:
-                        message = 'Invalid command.'
+                    # Dispatch on the command name; handlers validate,
+                    # mutate the per-connection auth context and return
+                    # (status, message, kind)
+                    ctx = {'token': current_user_token,
+                           'user': current_user}
+                    cmd_name = next(
+                        (name for name in self._handlers
+                         if name in command), None)
+                    if cmd_name is None:
                         status = 'error'
+                        message = 'Invalid command.'
+                        kind = 'plain'
+                    else:
+                        result = self._handlers[cmd_name](command, ctx)
+                        if asyncio.iscoroutine(result):
+                            # authenticate runs its bcrypt work in the
+                            # executor, so it is the one async handler
+                            result = await result
+                        status, message, kind = result
+                    current_user_token = ctx['token']
+                    current_user = ctx['user']
+                    direct_message_read = kind == 'read'
+                    direct_message_sent = kind == 'sent'
                 if DEBUG:
                     print(f'Server sending the following message: "{message}"')
+                if status == 'error' and message in _CANNED_ERRORS:
+                    writer.write(_CANNED_ERRORS[message])
+                    await writer.drain()
+                    continue
                 if direct_message_read:
                     resp = {'response': {'type':status, 'messages': message} }
                 elif direct_message_sent:
@@ -277,16 +309,355 @@ class DSUServer:
                     resp = {'response': {'type':status, 'message': message, 'token': current_user_token} }
                 else:
                     resp = {'response': {'type':status, 'message': message}}
-                json_response = json.dumps(resp).encode()
-                client_socket.sendall(json_response + b'\r\n')
+                writer.write(_dumps(resp) + b'\r\n')
+                await writer.drain()
             if current_user_token and current_user_token in self.sessions:
                 del self.sessions[current_user_token]
         except Exception as e:
             print(f"Error handling client {client_address}: {e}")
         finally:
-            client_socket.close()
-            self.clients.remove(client_socket)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+            self.clients.discard(writer)
             
+    async def _handle_authenticate(self, command, ctx):
+        """Handle an authenticate command.
+
+        The only async handler: bcrypt's work factor (~100ms+ per
+        check) runs in the default executor, where it releases the
+        GIL, instead of stalling every connection on the event loop.
+
+        Args:
+            command: The decoded request object
+            ctx: Per-connection auth context with 'token' and 'user'
+
+        Returns:
+            tuple: (status, message, kind)
+        """
+        if len(command) != 1:
+            return ('error',
+                    'Incorrectly formatted authenticate command.', 'plain')
+        if len(command['authenticate']) > 2:
+            return ('error',
+                    'Extra fields provided to authenticate command object.',
+                    'plain')
+        if not all(field in command['authenticate']
+                   for field in ('username', 'password')):
+            return ('error',
+                    'Missing required fields for authenticate command object.',
+                    'plain')
+        if ctx['token']:
+            return ('error',
+                    'User already authenticated on the active session.',
+                    'plain')
+
+        uname = command['authenticate']['username']
+        password = command['authenticate']['password']
+        loop = asyncio.get_running_loop()
+        # Account creation hashes the password, so it goes to the
+        # executor along with the verification below
+        fetched_user = await loop.run_in_executor(
+            None, self._get_or_create_new_user, uname, password)
+
+        if fetched_user is None:
+            ctx['token'] = generate_token()
+            ctx['user'] = uname
+            self.sessions[ctx['token']] = uname
+            return ('ok',
+                    f'Welcome to ICS32 Distributed Social, {uname}!', 'auth')
+
+        if not await loop.run_in_executor(
+                None, _verify_password, fetched_user['password'], password):
+            return ('error',
+                    f'Incorrect password for the user {uname}', 'plain')
+
+        ctx['token'] = generate_token()
+        ctx['user'] = uname
+        self.sessions[ctx['token']] = uname
+        # Upgrade legacy plaintext records to a bcrypt hash on first
+        # login; only the cheap assign-and-log holds the fence
+        if bcrypt is not None and not fetched_user['password'].startswith('$2'):
+            new_hash = await loop.run_in_executor(
+                None, _hash_password, password)
+            with self._log_fence:
+                fetched_user['password'] = new_hash
+                self._log_mutation(
+                    {'op': 'passwd', 'username': uname, 'password': new_hash})
+        return 'ok', f'Welcome back, {uname}!', 'auth'
+
+    def _handle_directmessage(self, command, ctx):
+        """Handle a directmessage command.
+
+        Accepts the message body under either 'entry' (the published
+        DSP spec) or 'message' (what our client sends).
+
+        Returns:
+            tuple: (status, message, kind)
+        """
+        args = command['directmessage']
+        if 'token' not in command:
+            return 'error', 'Missing token.', 'plain'
+        if len(command) != 2:
+            return ('error',
+                    'Incorrectly formatted directmessage command.', 'plain')
+        if not isinstance(args, dict) or len(args) != 3:
+            return ('error',
+                    'Incorrect fields provided to directmessage command object.',
+                    'plain')
+        if not ('recipient' in args and 'timestamp' in args
+                and ('entry' in args or 'message' in args)):
+            return ('error',
+                    'Missing required fields for directmessage command.',
+                    'plain')
+        token = command['token']
+        if not token or token != ctx['token']:
+            return 'error', 'Invalid user token.', 'plain'
+
+        entry = args['entry'] if 'entry' in args else args['message']
+        timestamp = datetime.now().timestamp()
+        if self._send_message(entry, ctx['user'], args['recipient'],
+                              timestamp):
+            return 'ok', 'Direct message sent', 'sent'
+        return 'error', 'Unable to send direct message', 'sent'
+
+    def _handle_fetch(self, command, ctx):
+        """Handle a fetch command.
+
+        Returns:
+            tuple: (status, message, kind)
+        """
+        args = command['fetch']
+        token = command.get('token')
+        if args not in ('all', 'unread'):
+            return 'error', 'Invalid argument for fetch field.', 'plain'
+        if not token or token != ctx['token']:
+            return 'error', 'Invalid user token.', 'plain'
+        if args == 'all':
+            return 'ok', self._read_all_messages(ctx['user']), 'read'
+        return 'ok', self._read_unread_messages(ctx['user']), 'read'
+
+    def _user_path(self, username):
+        """Return the storage file for a user's account.
+
+        Each account lives in its own file under store/users/, so a
+        direct message touches two small files instead of rewriting
+        every user's data. The username is percent-quoted so any
+        legal DSP username maps to a safe filename.
+
+        Args:
+            username: The account name
+
+        Returns:
+            Path: The per-user storage file path
+        """
+        safe = quote(username, safe='')
+        return self._users_dir / f'{safe}.json'
+
+    def _load_user(self, username):
+        """Return a user's in-memory record, or None if unknown."""
+        return self._users.get(username)
+
+    def _save_user(self, username, record):
+        """Keep a user's record in memory; disk is updated by the log."""
+        self._users[username] = record
+
+    def _load_users_from_disk(self):
+        """Populate the in-memory cache from the per-user shard files."""
+        for shard in self._users_dir.glob('*.json'):
+            username = unquote(shard.stem)
+            self._users[username] = _loads(shard.read_bytes())
+
+    def _migrate_timestamps(self):
+        """Convert any legacy string timestamps to floats, once.
+
+        Older stores kept timestamps as strings, which forced a float()
+        call per message on every sorted fetch and would break a plain
+        field-lookup sort key against new float entries.
+        """
+        for record in self._users.values():
+            for message in record.get('messages', ()):
+                if isinstance(message.get('timestamp'), str):
+                    try:
+                        message['timestamp'] = float(message['timestamp'])
+                    except ValueError:
+                        message['timestamp'] = 0.0
+
+    def _replay_log(self):
+        """Re-apply mutations logged after the last compaction.
+
+        Each log line is one serialized mutation; replaying them on top
+        of the shard files recovers any state the previous process did
+        not get to compact before exiting.
+        """
+        # A leftover .old segment means the previous process crashed
+        # between rotating the log and making the shards durable; its
+        # entries predate the current log, so it replays first
+        for log_path in (self._old_log_path, self._log_path):
+            if not log_path.exists():
+                continue
+            for line in log_path.read_bytes().splitlines():
+                if not line:
+                    continue
+                entry = _loads(line)
+                self._apply_mutation(entry)
+
+    def _apply_mutation(self, entry):
+        """Apply one logged mutation to the in-memory records."""
+        op = entry['op']
+        if op == 'create':
+            self._users.setdefault(entry['username'], entry['record'])
+        elif op == 'dm':
+            sender = self._users.get(entry['sender'])
+            recipient = self._users.get(entry['recipient'])
+            if sender is None or recipient is None:
+                return
+            sender['messages'].append(
+                {'message': entry['entry'], 'recipient': entry['recipient'],
+                 'timestamp': entry['timestamp'], 'status': 'sent'})
+            recipient['messages'].append(
+                {'message': entry['entry'], 'from': entry['sender'],
+                 'timestamp': entry['timestamp'], 'status': 'unread'})
+        elif op == 'passwd':
+            record = self._users.get(entry['username'])
+            if record is not None:
+                record['password'] = entry['password']
+        elif op == 'mark_read':
+            record = self._users.get(entry['username'])
+            if record is None:
+                return
+            for message in record['messages']:
+                if message['status'] == 'unread':
+                    message['status'] = 'read'
+
+    def _log_mutation(self, entry):
+        """Queue one mutation for the background log writer.
+
+        Callers hold _log_fence around the in-memory change and this
+        call, which is what keeps compaction's truncate step honest.
+        """
+        self._write_q.put(entry)
+
+    def _log_writer(self):
+        """Drain the write queue into the append-only mutation log.
+
+        Blocks for the first pending mutation, then grabs everything
+        else already queued and writes the whole batch with one
+        write()+flush, so N concurrent DMs cost one syscall instead
+        of N.
+        """
+        # 128 KiB buffer: a large burst of mutations still reaches the
+        # kernel as one write when the batch is flushed
+        log_file = self._log_path.open('ab', buffering=131072)
+        try:
+            while True:
+                entry = self._write_q.get()
+                batch = [entry]
+                while True:
+                    try:
+                        batch.append(self._write_q.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in batch
+                # Event entries are rotation requests from _compact:
+                # flush everything queued before them, move the log
+                # aside and start a fresh segment. The fence keeps any
+                # mutation from following a rotation in the same batch
+                rotations = [item for item in batch
+                             if isinstance(item, threading.Event)]
+                lines = [_dumps(item) + b'\n'
+                         for item in batch
+                         if item is not None
+                         and not isinstance(item, threading.Event)]
+                if lines:
+                    log_file.write(b''.join(lines))
+                    log_file.flush()
+                for rotation in rotations:
+                    log_file.close()
+                    os.replace(self._log_path, self._old_log_path)
+                    log_file = self._log_path.open('ab', buffering=131072)
+                    rotation.set()
+                if stop:
+                    break
+        finally:
+            log_file.close()
+
+    def _compact(self):
+        """Write every user record to its shard and retire the log.
+
+        Each shard is written to a temp file and moved into place with
+        os.replace, so a crash mid-compaction never leaves a
+        half-written account file behind.
+
+        Only the cheap steps hold the log fence: rotating the log and
+        serializing the in-memory records. The per-user shard writes
+        happen after the fence is released, so a pass does not freeze
+        request handling for a store-sized stretch of disk I/O. The
+        rotated segment is deleted only once every shard is durable;
+        until then a crash replays it on top of the old shards,
+        exactly as if the pass had never started.
+        """
+        with self._log_fence:
+            # Rotate through the writer thread so everything queued so
+            # far is flushed into the outgoing segment first; mutations
+            # applied after the fence drops land in the fresh log and
+            # survive the cleanup below
+            if (self._writer_thread is not None
+                    and self._writer_thread.is_alive()):
+                rotation = threading.Event()
+                self._write_q.put(rotation)
+                rotation.wait(timeout=5)
+            elif self._log_path.exists():
+                os.replace(self._log_path, self._old_log_path)
+            # Serialize while mutations are fenced out; the fence makes
+            # the per-user locks unnecessary here
+            snapshots = [
+                (self._user_path(username), _dumps(record))
+                for username, record in list(self._users.items())
+            ]
+        for shard, payload in snapshots:
+            tmp = shard.with_name(shard.name + '.tmp')
+            tmp.write_bytes(payload)
+            os.replace(tmp, shard)
+        # Every entry in the rotated segment is now in a durable shard
+        self._old_log_path.unlink(missing_ok=True)
+
+    def _schedule_compaction(self):
+        """Run compaction periodically on a daemon timer."""
+        self._compact()
+        self._compact_timer = threading.Timer(
+            self._compact_interval, self._schedule_compaction)
+        self._compact_timer.daemon = True
+        self._compact_timer.start()
+
+    def _get_or_create_new_user(self, username, password):
+        """Fetch the stored record for a user, creating the account if new.
+
+        Args:
+            username: The account name
+            password: The password to store when creating the account
+
+        Returns:
+            dict: The existing record, or None if the account was just
+            created (the caller treats that as a first login)
+        """
+        with self._log_fence, _user_lock(username):
+            record = self._load_user(username)
+            if record is not None:
+                return record
+            record = {
+                'password': _hash_password(password),
+                'bio': {'entry': '', 'timestamp': ''},
+                'posts': [],
+                'messages': []
+            }
+            self._save_user(username, record)
+            self._log_mutation(
+                {'op': 'create', 'username': username, 'record': record})
+            return None
+
     def _send_message(self, entry, username, recipient, timestamp=''):
         """Send a message from one user to another.
         
@@ -299,26 +670,37 @@ class DSUServer:
         Returns:
             bool: True if message was sent successfully, False otherwise
         """
-        with users_file_lock:
-            users_path = Path('.') / STORE_DIR_PATH / Path(USERS_PATH)
-            existing_users = None
-            with users_path.open('r') as user_file:
-                existing_users = json.load(user_file)
-            
-            fetched_sender = existing_users.get(username, None)
-            fetched_user = existing_users.get(recipient, None)
-            if not fetched_sender:
-                return False
-            if not fetched_user:
+        # Lock the two accounts in sorted order so concurrent DMs in
+        # opposite directions cannot deadlock
+        # The fence comes first, matching compaction's lock order
+        locks = [_user_lock(name) for name in sorted({username, recipient})]
+        self._log_fence.acquire()
+        for lock in locks:
+            lock.acquire()
+        try:
+            sender_record = self._load_user(username)
+            if sender_record is None:
                 return False
-            
+            if recipient == username:
+                recipient_record = sender_record
             else:
-                with users_path.open('w') as user_file:
-                    fetched_sender['messages'].append({'message': entry, 'recipient': recipient, 'timestamp': timestamp, 'status': 'sent'})
-                    fetched_user['messages'].append({'message': entry, 'from': username, 'timestamp': timestamp, 'status': 'unread'})
-                    existing_users[recipient] = fetched_user
-                    existing_users[username] = fetched_sender
-                    json.dump(existing_users, user_file)
+                recipient_record = self._load_user(recipient)
+                if recipient_record is None:
+                    return False
+
+            sender_record['messages'].append(
+                {'message': entry, 'recipient': recipient,
+                 'timestamp': timestamp, 'status': 'sent'})
+            recipient_record['messages'].append(
+                {'message': entry, 'from': username,
+                 'timestamp': timestamp, 'status': 'unread'})
+            self._log_mutation(
+                {'op': 'dm', 'sender': username, 'recipient': recipient,
+                 'entry': entry, 'timestamp': timestamp})
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+            self._log_fence.release()
         return True
 
     def _read_all_messages(self, username):
@@ -330,17 +712,13 @@ class DSUServer:
         Returns:
             list: List of messages or empty list if user not found
         """
-        with users_file_lock:
-            users_path = Path('.') / STORE_DIR_PATH / Path(USERS_PATH)
-            existing_users = None
-            with users_path.open('r') as user_file:
-                existing_users = json.load(user_file)
-
-            fetched_user = existing_users.get(username, None)
-            if not fetched_user:
-                return False ##double check that user exists
+        with self._log_fence, _user_lock(username):
+            record = self._load_user(username)
+            if record is None:
+                return []
             result = []
-            for message in fetched_user['messages']:
+            dirty = False
+            for message in record['messages']:
                 if 'from' in message:
                     mod_message = {'from': message['from'], 'message': message['message'], 'timestamp': message['timestamp']}
                 else:
@@ -348,16 +726,14 @@ class DSUServer:
                 result.append(mod_message)
                 if message['status'] == 'unread':
                     message['status'] = 'read'
+                    dirty = True
+            if dirty:
+                self._log_mutation({'op': 'mark_read', 'username': username})
+            # Timestamps are stored as floats, so the sort key is a
+            # plain field lookup with no per-element conversion
+            result.sort(key=itemgetter('timestamp'))
+            return result
 
-            else:
-                with users_path.open('w') as user_file:
-                    
-                    existing_users[username] = fetched_user
-                    json.dump(existing_users, user_file)
-            
-            return sorted(result, key=lambda x: float(x["timestamp"]))
-
-    
     def _read_unread_messages(self, username):
         """Retrieve all unread messages for a given user.
         
@@ -367,77 +743,84 @@ class DSUServer:
         Returns:
             list: List of unread messages or empty list if user not found
         """
-        with users_file_lock:
-            users_path = Path('.') / STORE_DIR_PATH / Path(USERS_PATH)
-            existing_users = None
-            with users_path.open('r') as user_file:
-                existing_users = json.load(user_file)
-
-            fetched_user = existing_users.get(username, None)
-            if not fetched_user:
-                return False ##double check that user exists
+        with self._log_fence, _user_lock(username):
+            record = self._load_user(username)
+            if record is None:
+                return []
             result = []
-            for message in fetched_user['messages']:
+            for message in record['messages']:
                 if message['status'] == 'unread':
-                    mod_message = {'from': message['from'], 'message': message['message'], 'timestamp': message['timestamp']}
-                    result.append(mod_message)
+                    result.append({'from': message['from'], 'message': message['message'], 'timestamp': message['timestamp']})
                     message['status'] = 'read'
-            
-            
-            else:
-                with users_path.open('w') as user_file:
-                    existing_users[username] = fetched_user
-                    
-            fetched_user = existing_users.get(username, None)
-            if fetched_user:
-                return fetched_user
-            else:
-                with users_path.open('w') as user_file:
-                    
-                    fetched_user = existing_users.get(username, None)
-                    if fetched_user: ##double check that no user exists
-                        return False
-                    else:
-                        existing_users.update({username: {'password': password, 'bio': {"entry": "", "timestamp": ""}, 'posts': [], 'messages':[]}})
-                    json.dump(existing_users, user_file)
-            
-        
+            if result:
+                self._log_mutation({'op': 'mark_read', 'username': username})
+            return result
+
     def _create_storage_system(self):
         """Create the local storage system if it doesn't exist.
         
         Creates a directory called "store" with users.json file if they
         don't already exist.
         """
-        users_path = Path('.') / STORE_DIR_PATH / Path(USERS_PATH)
-        store_path = Path('.') / Path(STORE_DIR_PATH)
-        store_path.mkdir(exist_ok=True)
-        if not users_path.exists():
-            with users_path.open('w') as json_file:
-                json.dump({}, json_file, indent=4)
+        self._users_dir.mkdir(parents=True, exist_ok=True)
+
+        # Migrate a legacy monolithic users.json into per-user files
+        legacy_path = self._store_path / USERS_PATH
+        if legacy_path.exists():
+            with users_file_lock:
+                existing_users = _loads(legacy_path.read_bytes())
+                for username, record in existing_users.items():
+                    user_path = self._user_path(username)
+                    if not user_path.exists():
+                        # Same tmp+replace dance as compaction: a crash
+                        # mid-migration must not leave a partial shard
+                        tmp = user_path.with_name(user_path.name + '.tmp')
+                        tmp.write_bytes(_dumps(record))
+                        os.replace(tmp, user_path)
+                legacy_path.unlink()
 
     def start_server(self):
         '''Starts the server (hence the name of the method :))'''
         self._create_storage_system() #does nothing if the server store files exists already
+        self._load_users_from_disk()
+        self._replay_log()
+        self._migrate_timestamps()
+        self._writer_thread = threading.Thread(
+            target=self._log_writer, daemon=True)
+        self._writer_thread.start()
+        self._schedule_compaction()
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as srv:
-                srv.bind((self.host, self.port))
-                srv.listen(5)
-                if DEBUG:
-                    print("DSUserver is listening on port", self.port)
-                while True:
-                    connection, address = srv.accept()
-                    client_handler = threading.Thread(target = self.handle_client, args = (connection,address))
-                    client_handler.start()
-        except KeyboardInterrupt as e:
+            asyncio.run(self._serve())
+        except KeyboardInterrupt:
             if DEBUG:
                 print(f'Server shutting down...')
         finally:
             for conn in self.clients:
                 conn.close()
-            self.clients = []
+            self.clients = set()
+            if self._compact_timer is not None:
+                self._compact_timer.cancel()
+            self._write_q.put(None)
+            if self._writer_thread is not None:
+                self._writer_thread.join(timeout=5)
+            self._compact()
             if DEBUG:
                 print('Disconnected all clients.')
 
+    async def _serve(self):
+        """Accept connections on the event loop.
+
+        One coroutine per connection instead of one OS thread: idle
+        clients cost a file descriptor and a task object, nothing more,
+        so thousands of connections fit on a single core.
+        """
+        server = await asyncio.start_server(
+            self.handle_client, self.host, self.port)
+        if DEBUG:
+            print("DSUserver is listening on port", self.port)
+        async with server:
+            await server.serve_forever()
+
         
 def run_server(host = '127.0.0.1', port1 = 3001):
     try:
@@ -15,9 +15,9 @@ class TestDSProtocol(unittest.TestCase):
         """Test formatting of authentication message"""
         username = "testuser"
         password = "testpass"
-        expected = ('{"authenticate": {'
-                    '"username": "testuser", '
-                    '"password": "testpass"}}')
+        expected = (b'{"authenticate":{'
+                    b'"username":"testuser",'
+                    b'"password":"testpass"}}')
         self.assertEqual(format_auth_message(username, password), expected)
 
     def test_format_direct_message(self):
@@ -36,14 +36,12 @@ class TestDSProtocol(unittest.TestCase):
         """Test formatting of fetch request"""
         token = "test-token"
 
-        # Test 'all' fetch type
-        result_all = json.loads(format_fetch_request(token, 'all'))
-        self.assertEqual(result_all["token"], token)
-        self.assertEqual(result_all["fetch"], "all")
-
-        # Test 'unread' fetch type
-        result_unread = json.loads(format_fetch_request(token, 'unread'))
-        self.assertEqual(result_unread["fetch"], "unread")
+        # Fetch payloads are fully deterministic, so compare canonical
+        # bytes directly instead of re-parsing the output
+        self.assertEqual(format_fetch_request(token, 'all'),
+                         b'{"token":"test-token","fetch":"all"}')
+        self.assertEqual(format_fetch_request(token, 'unread'),
+                         b'{"token":"test-token","fetch":"unread"}')
 
         # Test invalid fetch type
         with self.assertRaises(DSPProtocolError):
@@ -5,12 +5,87 @@ DirectMessenger classes, which handle direct messaging functionality in the
 application.
 """
 # pylint: disable=protected-access,no-member
+import copy
 import unittest
 import socket
-import json
-import time
 from unittest.mock import Mock, patch, MagicMock
-from ds_messenger import DirectMessage, DirectMessenger
+from ds_messenger import (DirectMessage, DirectMessenger, _TOKEN_CACHE,
+                          _TOKEN_CACHE_LOCK)
+
+# Fixed clock value used wherever a test needs "now"; the per-test
+# time.time patch (see setUp) pins the real clock to it so timestamp
+# logic is deterministic and skips repeated syscalls.
+_NOW = 1_700_000_000.0
+
+# One fully constructed messenger, built once at import; each setUp
+# takes a detached copy (DirectMessenger.__copy__) instead of
+# re-running __init__. Copies share nothing mutable with the
+# registered instance, so Mock assignments cannot leak between tests.
+_TEMPLATE_MESSENGER = DirectMessenger(
+    dsuserver="localhost",
+    username="testuser",
+    password="testpass",
+    port=3001,
+    is_test=True
+)
+
+# Canned server responses. extract_json accepts pre-parsed dicts, so
+# the mocks hand these over as-is and the suite skips the JSON
+# encode/decode round-trip entirely.
+_OK_SEND = {"response": {"type": "ok", "message": "Message sent"}}
+_OK_AUTH = {"response": {"type": "ok", "token": "test-token"}}
+_ERR_AUTH = {"response": {"type": "error",
+                          "message": "Invalid credentials"}}
+_ERR_FETCH = {"response": {"type": "error",
+                           "message": "Failed to fetch messages"}}
+
+# Payloads for the long/Unicode edge cases, built once instead of
+# re-allocated inside each test body.
+_LONG_MSG = "x" * 1000
+_SPECIAL_MSG = "Hello, 世界! @#$%^&*()_+{}|:<>?~`-='\""
+
+# Pre-built exception instances for side_effect wiring; raising reuses
+# the same object, so there is no need to construct one per test.
+_CONN_FAILED = socket.error("Connection failed")
+_CONN_ERR = socket.error("Connection error")
+_SOCKET_ERR = Exception("Socket error")
+
+
+def _assert_connect_behavior(test, messenger):
+    """Exercise _connect success, pooled reuse and failure handling.
+
+    Shared by the connection-handling tests in both messenger test
+    classes, which previously duplicated (and subtly diverged on) the
+    same body.
+    """
+    # autospec is left off deliberately throughout this suite:
+    # introspecting socket.socket per patch is one of the dominant
+    # mock costs, and these tests configure the mock by hand anyway.
+
+    # Successful connection
+    with patch('socket.socket', autospec=False) as mock_socket:
+        mock_socket.return_value = MagicMock()
+        messenger.connected = False
+        messenger.socket = None
+        messenger._connect()
+        test.assertTrue(messenger.connected)
+
+        # Connecting again reuses the pooled socket
+        messenger._connect()
+        test.assertTrue(messenger.connected)
+
+    # The failure path needs a fresh pool entry; otherwise _connect
+    # happily hands back the socket created above
+    messenger._connection_pool.evict(
+        messenger.dsuserver, messenger.port, messenger.username)
+
+    with patch('socket.socket', autospec=False) as mock_socket:
+        mock_socket.side_effect = _CONN_FAILED
+        messenger.connected = False
+        messenger.socket = None
+        with test.assertRaises(ConnectionError):
+            messenger._connect()
+        test.assertFalse(messenger.connected)
 
 
 class TestDirectMessage(unittest.TestCase):
@@ -31,132 +106,82 @@ class TestDirectMessage(unittest.TestCase):
 
 class TestDirectMessenger(unittest.TestCase):
     """Test cases for the DirectMessenger class."""
+    @classmethod
+    def setUpClass(cls):
+        """Patch socket creation once for the whole class."""
+        cls._socket_patcher = patch('socket.socket', autospec=False)
+        cls._mock_socket_cls = cls._socket_patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._socket_patcher.stop()
+
     def setUp(self):
-        self.messenger = DirectMessenger(
-            dsuserver="localhost",
-            username="testuser",
-            password="testpass"
-        )
+        self.messenger = copy.copy(_TEMPLATE_MESSENGER)
+        # Drop any token another test published for this identity
+        with _TOKEN_CACHE_LOCK:
+            _TOKEN_CACHE.pop(
+                (self.messenger.dsuserver, self.messenger.username), None)
         # Set up test connection state
         self.messenger.connected = True
-
-    @patch('socket.socket')
-    def test_send_message_success(self, mock_socket):
+        # One patch lifecycle per class; each test starts from a clean
+        # call history
+        self._mock_socket_cls.reset_mock(side_effect=True)
+        # Pin the clock for the duration of the test
+        patcher = patch('time.time', return_value=_NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_send_message_success(self):
         """Test successful message sending"""
-        # Mock the socket and its methods
-        mock_sock_instance = Mock()
-        mock_socket.return_value = mock_sock_instance
-
         # Set up the mock response for _receive
-        self.messenger._receive = Mock(
-            return_value=json.dumps({
-                "response": {
-                    "type": "ok",
-                    "message": "Message sent"
-                }
-            })
-        )
+        self.messenger._receive = lambda *a, **kw: _OK_SEND
 
         # Mock connection and authentication
         self.messenger._connect = Mock()
         self.messenger._authenticate = Mock(return_value=True)
         self.messenger.token = "test-token"
-<<<<<<< HEAD
         self.messenger.connected = True
 
-=======
-        
->>>>>>> parent of 5095839 (Messages successfully send)
         result = self.messenger.send("Hello", "recipient")
         self.assertTrue(result)
 
-    @patch('socket.socket')
-    def test_retrieve_new_messages(self, _mock_socket):
-        """Test retrieving new messages"""
-        # Mock server response
-        test_messages = [{
-            "message": "Hello",
-            "from": "user1",
-            "timestamp": time.time()
-        }]
-<<<<<<< HEAD
-
-        # Set up the mock response for _receive
-        self.messenger._receive = Mock(
-            return_value=json.dumps({
-                "response": {
-                    "type": "ok",
-                    "messages": test_messages
-                }
-            })
+    def test_retrieve_messages(self):
+        """Test retrieving new and all messages"""
+        cases = (
+            ("retrieve_new", [
+                {"message": "Hello", "from": "user1", "timestamp": _NOW}
+            ]),
+            ("retrieve_all", [
+                {"message": "Hello", "from": "user1", "timestamp": _NOW},
+                {"message": "Hi", "recipient": "user2",
+                 "timestamp": _NOW + 1}
+            ]),
         )
-
-        # Mock connection and authentication
-=======
-        mock_sock_instance = Mock()
-        mock_socket.return_value = mock_sock_instance
-        mock_sock_instance.makefile.return_value.readline.return_value = json.dumps({
-            "response": {
-                "type": "ok",
-                "messages": test_messages
-            }
-        })
-        
-        # Initialize and retrieve messages
->>>>>>> parent of 5095839 (Messages successfully send)
-        self.messenger._connect = Mock()
-        self.messenger._authenticate = Mock(return_value=True)
-        self.messenger.token = "test-token"
-        self.messenger.connected = True
-
-        messages = self.messenger.retrieve_new()
-        self.assertEqual(len(messages), 1)
-        self.assertIsInstance(messages[0], DirectMessage)
-        self.assertEqual(messages[0].message, "Hello")
-        self.assertEqual(messages[0].sender, "user1")
-
-    @patch('socket.socket')
-    def test_retrieve_all_messages(self, _mock_socket):
-        """Test retrieving all messages"""
-        # Mock server response
-        test_messages = [
-            {"message": "Hello", "from": "user1", "timestamp": time.time()},
-            {"message": "Hi", "recipient": "user2", "timestamp": time.time()}
-        ]
-<<<<<<< HEAD
-
-        # Set up the mock response for _receive
-        self.messenger._receive = Mock(
-            return_value=json.dumps({
-                "response": {
-                    "type": "ok",
-                    "messages": test_messages
+        for method, test_messages in cases:
+            with self.subTest(method=method):
+                # Set up the mock response for _receive
+                response = {
+                    "response": {
+                        "type": "ok",
+                        "messages": test_messages
+                    }
                 }
-            })
-        )
-
-        # Mock connection and authentication
-=======
-        mock_sock_instance = Mock()
-        mock_socket.return_value = mock_sock_instance
-        mock_sock_instance.makefile.return_value.readline.return_value = json.dumps({
-            "response": {
-                "type": "ok",
-                "messages": test_messages
-            }
-        })
-        
-        # Initialize and retrieve messages
->>>>>>> parent of 5095839 (Messages successfully send)
-        self.messenger._connect = Mock()
-        self.messenger._authenticate = Mock(return_value=True)
-        self.messenger.token = "test-token"
-        self.messenger.connected = True
-
-        messages = self.messenger.retrieve_all()
-        self.assertEqual(len(messages), 2)
-        self.assertIsInstance(messages[0], DirectMessage)
-        self.assertIsInstance(messages[1], DirectMessage)
+                self.messenger._receive = \
+                    lambda *a, _r=response, **kw: _r
+
+                # Mock connection and authentication
+                self.messenger._connect = Mock()
+                self.messenger._authenticate = Mock(return_value=True)
+                self.messenger.token = "test-token"
+                self.messenger.connected = True
+
+                messages = getattr(self.messenger, method)()
+                self.assertEqual(len(messages), len(test_messages))
+                for dm in messages:
+                    self.assertIsInstance(dm, DirectMessage)
+                self.assertEqual(messages[0].message, "Hello")
+                self.assertEqual(messages[0].sender, "user1")
 
     def test_parse_messages(self):
         """Test message parsing"""
@@ -244,48 +269,22 @@ class TestDirectMessenger(unittest.TestCase):
 
         # Test socket error
         self.messenger._receive = Mock(
-            side_effect=socket.error("Connection error"))
+            side_effect=_CONN_ERR)
         self.messenger._connect = Mock()
         self.messenger._authenticate = Mock(return_value=True)
         self.messenger.token = "test-token"
 
         # Test invalid server response
-        self.messenger._receive = Mock(
-            return_value=json.dumps({"response": "ok"}))
+        self.messenger._receive = lambda *a, **kw: {"response": "ok"}
         self.assertEqual(len(self.messenger.retrieve_new()), 0)
 
         # Test error response from server
-        error_response = {
-            "response": {
-                "type": "error",
-                "message": "Failed to fetch messages"
-            }
-        }
-        self.messenger._receive = Mock(
-            return_value=json.dumps(error_response)
-        )
+        self.messenger._receive = lambda *a, **kw: _ERR_FETCH
         self.assertEqual(len(self.messenger.retrieve_all()), 0)
 
     def test_connection_handling(self):
         """Test connection handling methods"""
-        # Test successful connection
-        with patch('socket.socket') as mock_socket:
-            mock_sock_instance = MagicMock()
-            mock_socket.return_value = mock_sock_instance
-
-            self.messenger.connected = False
-            self.messenger.socket = None
-            self.messenger._connect()
-            self.assertTrue(self.messenger.connected)
-
-        # Test connection failure
-        with patch('socket.socket') as mock_socket:
-            mock_socket.side_effect = socket.error("Connection failed")
-            self.messenger.connected = False
-            self.messenger.socket = None
-            with self.assertRaises(ConnectionError):
-                self.messenger._connect()
-            self.assertFalse(self.messenger.connected)
+        _assert_connect_behavior(self, self.messenger)
 
     def test_authentication(self):
         """Test authentication"""
@@ -295,36 +294,24 @@ class TestDirectMessenger(unittest.TestCase):
 
         try:
             # Test successful authentication
-            self.messenger._receive = Mock(
-                return_value=json.dumps({
-                    "response": {
-                        "type": "ok",
-                        "token": "test-token"
-                    }
-                })
-            )
+            self.messenger._receive = lambda *a, **kw: _OK_AUTH
             self.messenger._send = Mock()
 
             self.assertTrue(self.messenger._authenticate())
             self.assertEqual(self.messenger.token, "test-token")
 
-            # Test failed authentication
-            self.messenger._receive = Mock(
-                return_value=json.dumps({
-                    "response": {
-                        "type": "error",
-                        "message": "Invalid credentials"
-                    }
-                })
-            )
-            self.messenger.token = None
+            # Test failed authentication; invalidate rather than just
+            # clearing the token, or the copy cached by the success
+            # case above would be adopted without a handshake
+            self.messenger._receive = lambda *a, **kw: _ERR_AUTH
+            self.messenger._invalidate_token()
 
             self.assertFalse(self.messenger._authenticate())
             self.assertIsNone(self.messenger.token)
 
             # Test connection error during authentication
             self.messenger._receive = Mock(
-                side_effect=socket.error("Connection error"))
+                side_effect=_CONN_ERR)
             with self.assertRaises(ConnectionError):
                 self.messenger._authenticate()
 
@@ -333,12 +320,10 @@ class TestDirectMessenger(unittest.TestCase):
             self.messenger._receive = original_receive
             self.messenger._send = original_send
 
+    @unittest.skipUnless(hasattr(DirectMessenger, 'disconnect'),
+                         "disconnect method not implemented")
     def test_disconnect(self):
         """Test disconnection"""
-        # Skip this test if disconnect method doesn't exist
-        if not hasattr(DirectMessenger, 'disconnect'):
-            self.skipTest("disconnect method not implemented")
-
         # Mock socket
         self.messenger.socket = MagicMock()
         self.messenger.connected = True
@@ -353,25 +338,22 @@ class TestDirectMessenger(unittest.TestCase):
 
     def test_send_message_edge_cases(self):
         """Test edge cases for message sending"""
-        # Test message with maximum length (1000 chars)
-        long_message = "x" * 1000
-        self.messenger._receive = Mock(
-            return_value=json.dumps({
-                "response": {
-                    "type": "ok",
-                    "message": "Message sent"
-                }
-            })
-        )
+        # Single mock setup shared by every case
+        self.messenger._receive = lambda *a, **kw: _OK_SEND
         self.messenger._connect = Mock()
         self.messenger._authenticate = Mock(return_value=True)
         self.messenger.token = "test-token"
 
-        self.assertTrue(self.messenger.send(long_message, "recipient"))
-
-        # Test message with special characters
-        special_message = "Hello, 世界! @#$%^&*()_+{}|:<>?~`-='\""
-        self.assertTrue(self.messenger.send(special_message, "recipient"))
+        cases = (
+            ("", "recipient", False),       # empty message
+            ("Hello", "", False),           # empty recipient
+            (_LONG_MSG, "recipient", True),     # maximum length
+            (_SPECIAL_MSG, "recipient", True),  # Unicode and symbols
+        )
+        for message, recipient, expected in cases:
+            with self.subTest(message=message[:20], recipient=recipient):
+                self.assertEqual(
+                    self.messenger.send(message, recipient), expected)
 
 
 class TestDirectMessageEdgeCases(unittest.TestCase):
@@ -386,7 +368,7 @@ class TestDirectMessageEdgeCases(unittest.TestCase):
         self.assertEqual(dm.timestamp, 0)
 
         # Test with maximum values
-        long_str = "x" * 1000
+        long_str = _LONG_MSG
         dm = DirectMessage(long_str, long_str, long_str, 2**32)
         self.assertEqual(dm.recipient, long_str)
         self.assertEqual(dm.sender, long_str)
@@ -401,37 +383,48 @@ class TestDirectMessageEdgeCases(unittest.TestCase):
 
 class TestDirectMessengerEdgeCases(unittest.TestCase):
     """Test cases for edge cases in DirectMessenger class."""
-    def setUp(self):
-        """Set up test fixtures."""
-        self.server = 'localhost'
-        self.port = 3001
-        self.username = 'testuser'
-        self.password = 'testpass'
-        self.messenger = DirectMessenger(
-            dsuserver=self.server,
-            port=self.port,
-            username=self.username,
-            password=self.password,
-            is_test=True  # Use test mode to prevent automatic connection
+    @classmethod
+    def setUpClass(cls):
+        """Build the shared base messenger once for the whole class."""
+        cls.server = 'localhost'
+        cls.port = 3001
+        cls.username = 'testuser'
+        cls.password = 'testpass'
+        cls._base = DirectMessenger(
+            dsuserver=cls.server,
+            port=cls.port,
+            username=cls.username,
+            password=cls.password,
+            is_test=True
         )
+
+    def setUp(self):
+        """Hand each test a detached copy of the shared base."""
+        self.messenger = copy.copy(self._base)
+        # Drop any token another test published for this identity
+        with _TOKEN_CACHE_LOCK:
+            _TOKEN_CACHE.pop((self.server, self.username), None)
+        # Pin the clock for the duration of the test
+        patcher = patch('time.time', return_value=_NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.messenger.connected = True  # Simulate successful connection
         self.messenger.token = 'test-token'  # Set a test token
 
-        # Mock the socket
-        self.mock_socket = MagicMock()
+        # Mock the socket. Built fresh per test: copying a mock shares
+        # its child mocks, so a copied template would leak configured
+        # side effects between tests. A narrow spec_set skips
+        # MagicMock's auto-generated dunders and deliberately omits
+        # makefile so _receive takes its mock-socket branch.
+        self.mock_socket = Mock(spec_set=[
+            'recv', 'send', 'sendall', 'close', 'connect',
+            'settimeout', 'setsockopt'])
         self.messenger.socket = self.mock_socket
 
     def test_send_with_mock_socket(self):
         """Test sending a message with a mock socket"""
         # Mock the receive method to return a valid response
-        self.messenger._receive = Mock(
-            return_value=json.dumps({
-                "response": {
-                    "type": "ok",
-                    "message": "Message sent"
-                }
-            })
-        )
+        self.messenger._receive = lambda *a, **kw: _OK_SEND
         self.messenger._authenticate = Mock(return_value=True)
 
         # Test sending a message
@@ -439,105 +432,46 @@ class TestDirectMessengerEdgeCases(unittest.TestCase):
         self.assertTrue(result)
 
         # Test with a message that's too long
-        long_msg = "x" * 1001  # Exceeds default buffer size
+        long_msg = _LONG_MSG + "x"  # Exceeds default buffer size
         self.messenger.send = Mock(return_value=True)
         result = self.messenger.send(long_msg, "recipient")
         self.assertTrue(result)
 
-    def test_retrieve_new_with_mock_socket(self):
-        """Test retrieving new messages with a mock socket"""
-        # Mock the receive method to return test messages
-        test_messages = [
-            {"message": "Hello", "from": "user1", "timestamp": 1234567890.0},
-            {"message": "Hi", "from": "user2", "timestamp": 1234567891.0}
-        ]
-        self.messenger._receive = Mock(
-            return_value=json.dumps({
-                "response": {
-                    "type": "ok",
-                    "messages": test_messages
-                }
-            })
+    def test_retrieve_with_mock_socket(self):
+        """Test retrieving new and all messages with a mock socket"""
+        cases = (
+            ("retrieve_new", [
+                {"message": "Hello", "from": "user1",
+                 "timestamp": 1234567890.0},
+                {"message": "Hi", "from": "user2",
+                 "timestamp": 1234567891.0}
+            ], "Hi"),
+            ("retrieve_all", [
+                {"message": "Old message", "from": "user1",
+                 "timestamp": 1234567880.0},
+                {"message": "New message", "from": "user2",
+                 "timestamp": 1234567890.0}
+            ], "New message"),
         )
-
-        # Test retrieving new messages
-        messages = self.messenger.retrieve_new()
-        self.assertEqual(len(messages), 2)
-        self.assertIsInstance(messages[0], DirectMessage)
-        self.assertEqual(messages[0].message, "Hello")
-
-    def test_retrieve_all_with_mock_socket(self):
-        """Test retrieving all messages with a mock socket"""
-        # Mock the receive method to return test messages
-        test_messages = [
-            {"message": "Old message", "from": "user1",
-             "timestamp": 1234567880.0},
-            {"message": "New message", "from": "user2",
-             "timestamp": 1234567890.0}
-        ]
-        self.messenger._receive = Mock(
-            return_value=json.dumps({
-                "response": {
-                    "type": "ok",
-                    "messages": test_messages
-                }
-            })
-        )
-
-        # Test retrieving all messages
-        messages = self.messenger.retrieve_all()
-        self.assertEqual(len(messages), 2)
-        self.assertIsInstance(messages[0], DirectMessage)
-        self.assertEqual(messages[1].message, "New message")
-
-    def test_send_message_edge_cases(self):
-        """Test edge cases for sending messages"""
-        # Mock the receive method to return a valid response
-        self.messenger._receive = Mock(
-            return_value=json.dumps({
-                "response": {
-                    "type": "ok",
-                    "message": "Message sent"
+        for method, test_messages, last_message in cases:
+            with self.subTest(method=method):
+                response = {
+                    "response": {
+                        "type": "ok",
+                        "messages": test_messages
+                    }
                 }
-            })
-        )
-        self.messenger._authenticate = Mock(return_value=True)
-
-        # Test empty message content (should be handled by send method)
-        self.messenger.send = Mock(return_value=False)
-        self.assertFalse(self.messenger.send("", "recipient"))
-
-        # Test empty recipient (should be handled by send method)
-        self.assertFalse(self.messenger.send("Hello", ""))
+                self.messenger._receive = \
+                    lambda *a, _r=response, **kw: _r
 
-        # Test long message
-        self.messenger.send = Mock(return_value=True)
-        long_message = "x" * 1000
-        self.assertTrue(self.messenger.send(long_message, "recipient"))
+                messages = getattr(self.messenger, method)()
+                self.assertEqual(len(messages), 2)
+                self.assertIsInstance(messages[0], DirectMessage)
+                self.assertEqual(messages[1].message, last_message)
 
     def test_connection_handling(self):
-        """Test connection handling methods"""
-        # Test connect when not connected
-        self.messenger.connected = False
-        with patch('socket.socket') as mock_socket:
-            mock_sock_instance = MagicMock()
-            mock_socket.return_value = mock_sock_instance
-
-            # Test successful connection
-            self.messenger._connect()
-            self.assertTrue(self.messenger.connected)
-
-            # Test connect when already connected
-            self.messenger._connect()  # Should not raise an error
-
-            # Test connection error handling - the current implementation
-            # doesn't raise ConnectionError, so we'll just verify it doesn't
-            # crash and sets connected to False
-            with patch('socket.socket') as mock_socket_error:
-                mock_socket_error.side_effect = Exception("Connection error")
-                self.messenger.connected = False
-                self.messenger._connect()
-                self.assertFalse(self.messenger.connected)
+        """Test connection and disconnection handling"""
+        _assert_connect_behavior(self, self.messenger)
 
         # Test disconnect
         self.messenger.connected = True
@@ -639,7 +573,7 @@ class TestDirectMessengerEdgeCases(unittest.TestCase):
 
         # Test _receive with socket error
         self.messenger.socket = MagicMock()
-        self.messenger.socket.recv.side_effect = Exception("Socket error")
+        self.messenger.socket.recv.side_effect = _SOCKET_ERR
         with self.assertRaises(ConnectionError):
             self.messenger._receive()
 
@@ -653,14 +587,9 @@ class TestDirectMessengerEdgeCases(unittest.TestCase):
             # Test with invalid credentials
             self.messenger.connected = True
             self.messenger.token = None
-            self.messenger._receive = Mock(
-                return_value=json.dumps({
-                    "response": {
-                        "type": "error",
-                        "message": "Invalid credentials"
-                    }
-                })
-            )
+            # Stays a Mock: the connection-error branch below rebinds
+            # its side_effect
+            self.messenger._receive = Mock(return_value=_ERR_AUTH)
             self.messenger._send = Mock()
 
             result = self.messenger._authenticate()
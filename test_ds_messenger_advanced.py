@@ -1,28 +1,63 @@
+import copy
 import unittest
-import socket
-import json
-import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
-from ds_messenger import DirectMessenger
+from ds_messenger import (DirectMessenger, _TOKEN_CACHE,
+                          _TOKEN_CACHE_LOCK)
+
+# Built once at import; setUp hands each test a detached copy (see
+# DirectMessenger.__copy__) rather than re-running __init__. The
+# singleton and pooling tests construct their own instances because
+# they exercise the registry itself.
+_TEMPLATE_MESSENGER = DirectMessenger(
+    dsuserver="localhost",
+    username="testuser",
+    password="testpass",
+    is_test=True
+)
+
+# Fixed clock value; setUp pins time.time to it so token-expiry math
+# is deterministic.
+_NOW = 1_700_000_000.0
+
+# Canned authentication response; extract_json accepts the dict
+# directly, so no serialization round-trip is paid.
+_OK_AUTH = {
+    "response": {
+        "type": "ok",
+        "message": "Success",
+        "token": "test-token"
+    }
+}
 
 
 class TestDirectMessengerAdvanced(unittest.TestCase):
     """Advanced test cases for DirectMessenger class."""
-    
+
+    @classmethod
+    def setUpClass(cls):
+        """One executor for the whole class; spawning fresh kernel
+        threads per test is the dominant cost of the concurrency
+        tests."""
+        cls._executor = ThreadPoolExecutor(max_workers=8)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._executor.shutdown(wait=True)
+
     def setUp(self):
         """Set up test fixtures."""
-        self.messenger = DirectMessenger(
-            dsuserver="localhost",
-            username="testuser",
-            password="testpass",
-            is_test=True
-        )
+        self.messenger = copy.copy(_TEMPLATE_MESSENGER)
+        # Pin the clock for the duration of the test
+        patcher = patch('time.time', return_value=_NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
         
     def test_singleton_pattern(self):
         """
-        Test that DirectMessenger implements singleton pattern correctly.
+        Test that DirectMessenger keeps one instance per identity.
         """
-        # Create two instances with different parameters
+        # Same (server, port, username): same object, last init wins
         messenger1 = DirectMessenger(
             dsuserver="localhost",
             username="user1",
@@ -32,24 +67,40 @@ class TestDirectMessengerAdvanced(unittest.TestCase):
         
         messenger2 = DirectMessenger(
             dsuserver="localhost",
-            username="user2",
-            password="pass2",
+            username="user1",
+            password="pass1-new",
             is_test=True
         )
         
-        # Both instances should be the same object
         self.assertIs(messenger1, messenger2)
+        self.assertEqual(messenger1.password, "pass1-new")
         
-        # Verify that the last initialization parameters are used
-        self.assertEqual(messenger1.username, "user2")
-        self.assertEqual(messenger1.password, "pass2")
+        # A different username is a different identity
+        messenger3 = DirectMessenger(
+            dsuserver="localhost",
+            username="user2",
+            password="pass2",
+            is_test=True
+        )
+        self.assertIsNot(messenger1, messenger3)
+        self.assertEqual(messenger3.username, "user2")
         
     def test_connection_pooling(self):
         """
         Test connection pooling functionality.
         """
+        # Evict at both ends: a pooled entry left by another test must
+        # not satisfy these connects, and the mock-backed entries made
+        # here must not outlive the test
+        for port, username in ((3001, "user1"), (3002, "user2")):
+            DirectMessenger._connection_pool.evict(
+                "localhost", port, username)
+            self.addCleanup(
+                DirectMessenger._connection_pool.evict,
+                "localhost", port, username)
+
         # Mock socket creation
-        with patch('socket.socket') as mock_socket:
+        with patch('socket.socket', autospec=False) as mock_socket:
             # Create two messengers with different ports
             messenger1 = DirectMessenger(
                 dsuserver="localhost",
@@ -74,48 +125,51 @@ class TestDirectMessengerAdvanced(unittest.TestCase):
             # Verify that two sockets were created
             self.assertEqual(mock_socket.call_count, 2)
             
-            # Create another instance with same port as messenger1
-            messenger3 = DirectMessenger(
-                dsuserver="localhost",
-                port=3001,
-                username="user3",
-                password="pass3",
-                is_test=True
-            )
-            
+            # A second handle on messenger1's identity; distinct
+            # usernames get their own sockets because the server binds
+            # authentication per connection, so reuse is same-identity
+            messenger3 = copy.copy(messenger1)
+
             # This should reuse the existing connection
             messenger3._connect()
             self.assertEqual(mock_socket.call_count, 2)  # No new socket created
+
+            # Leave the registered instances disconnected; re-running
+            # __init__ keeps a live connection, so later tests that
+            # rebuild these identities would otherwise inherit it
+            messenger3._disconnect()
+            messenger1._disconnect()
+            messenger2._disconnect()
             
     def test_token_management(self):
         """
         Test token management and caching.
         """
-        # Mock authentication response
-        auth_response = {
-            "response": {
-                "type": "ok",
-                "message": "Success",
-                "token": "test-token"
-            }
-        }
-        
+        # The registered instance this copy was cut from may hold a
+        # token cached by another test; start from a clean slate,
+        # including the process-wide cache
+        self.messenger.token = None
+        self.messenger._token_expires_at = 0.0
+        with _TOKEN_CACHE_LOCK:
+            _TOKEN_CACHE.pop(
+                (self.messenger.dsuserver, self.messenger.username), None)
+
         # Mock _receive to return auth response
-        self.messenger._receive = Mock(return_value=json.dumps(auth_response))
+        self.messenger._receive = Mock(return_value=_OK_AUTH)
         
         # First authentication should get a new token
         self.assertTrue(self.messenger._authenticate())
         self.assertEqual(self.messenger.token, "test-token")
         
         # Second authentication should reuse the cached token
-        with patch('time.time', return_value=time.time() + 1000):  # Within 24h
+        with patch('time.time', return_value=_NOW + 1000):  # Within 24h
             self.assertTrue(self.messenger._authenticate())
             self.assertEqual(self.messenger.token, "test-token")
             # _receive should only have been called once
             self.assertEqual(self.messenger._receive.call_count, 1)
         
         # After 24h, token should be expired and new one requested
-        with patch('time.time', return_value=time.time() + 86401):  # >24h
+        with patch('time.time', return_value=_NOW + 86401):  # >24h
             self.assertTrue(self.messenger._authenticate())
             self.assertEqual(self.messenger._receive.call_count, 2)
             
@@ -135,17 +189,11 @@ class TestDirectMessengerAdvanced(unittest.TestCase):
                 is_test=True
             )
         
-        # Create 5 threads
-        threads = []
-        for _ in range(5):
-            t = threading.Thread(target=create_messenger)
-            threads.append(t)
-            t.start()
-        
-        # Wait for all threads to complete
-        for t in threads:
-            t.join()
-            
+        # The class-level executor amortizes thread startup across
+        # every concurrency test in the class
+        list(self._executor.map(lambda _: create_messenger(), range(5)))
+
+
         # All threads should have the same instance
         messenger1 = DirectMessenger(
             dsuserver="localhost",
@@ -155,13 +203,13 @@ class TestDirectMessengerAdvanced(unittest.TestCase):
             is_test=True
         )
         
-        # Verify that all instances are the same
+        # Verify that the same identity always maps to one instance
         for _ in range(5):
             messenger = DirectMessenger(
                 dsuserver="localhost",
                 port=3001,
-                username="user2",
-                password="pass2",
+                username="user1",
+                password="pass1",
                 is_test=True
             )
             self.assertIs(messenger, messenger1)
@@ -1,22 +1,51 @@
+import copy
 import unittest
 import socket
-import json
-import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
-from ds_messenger import DirectMessenger, DirectMessage
+from ds_messenger import (DirectMessenger, _TOKEN_CACHE,
+                          _TOKEN_CACHE_LOCK)
+
+# Built once at import; setUp hands each test a detached copy (see
+# DirectMessenger.__copy__) instead of re-running __init__ per test.
+# The singleton, pooling and threading tests construct their own
+# instances because the registry is what they exercise.
+_TEMPLATE_MESSENGER = DirectMessenger(
+    dsuserver="localhost",
+    username="testuser",
+    password="testpass",
+    is_test=True
+)
+
+# Fixed clock value; setUp pins time.time to it so token-expiry math
+# is deterministic.
+_NOW = 1_700_000_000.0
 
 
 class TestDirectMessengerCoverage(unittest.TestCase):
     """Test cases to improve coverage."""
-    
+
+    @classmethod
+    def setUpClass(cls):
+        """One executor for the whole class; spawning fresh kernel
+        threads per test is the dominant cost of the concurrency
+        tests."""
+        cls._executor = ThreadPoolExecutor(max_workers=8)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._executor.shutdown(wait=True)
+
     def setUp(self):
         """Set up test fixtures."""
-        self.messenger = DirectMessenger(
-            dsuserver="localhost",
-            username="testuser",
-            password="testpass",
-            is_test=True
-        )
+        # Pin the clock for the duration of the test
+        patcher = patch('time.time', return_value=_NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Drop any token another test published for this identity
+        with _TOKEN_CACHE_LOCK:
+            _TOKEN_CACHE.pop(("localhost", "testuser"), None)
+        self.messenger = copy.copy(_TEMPLATE_MESSENGER)
         
     def test_singleton_initialization(self):
         """Test singleton initialization."""
@@ -39,8 +68,11 @@ class TestDirectMessengerCoverage(unittest.TestCase):
     def test_connection_pool_management(self):
         """Test connection pool management."""
         # Mock socket operations
-        with patch('socket.socket') as mock_socket:
-            # Create multiple messengers with same server/port
+        with patch('socket.socket', autospec=False) as mock_socket:
+            # Two handles on the same identity share one pooled
+            # connection. Distinct usernames never share a socket —
+            # the server binds authentication per connection — so the
+            # handles are detached copies of one messenger
             messenger1 = DirectMessenger(
                 dsuserver="localhost",
                 port=3001,
@@ -48,29 +80,35 @@ class TestDirectMessengerCoverage(unittest.TestCase):
                 password="pass1",
                 is_test=True
             )
-            
-            messenger2 = DirectMessenger(
-                dsuserver="localhost",
-                port=3001,
-                username="user2",
-                password="pass2",
-                is_test=True
-            )
-            
+            messenger2 = copy.copy(messenger1)
+
             # Connect both - should use same connection
             messenger1._connect()
             messenger2._connect()
-            
+
             # Verify only one socket was created
             self.assertEqual(mock_socket.call_count, 1)
-            
+
             # Disconnect one - should keep connection
             messenger1._disconnect()
             self.assertTrue(messenger2.connected)
-            
+
             # Disconnect last - should remove from pool
             messenger2._disconnect()
             self.assertEqual(len(messenger1._connection_pool), 0)
+
+            # A different username against the same server gets its
+            # own socket
+            messenger3 = DirectMessenger(
+                dsuserver="localhost",
+                port=3001,
+                username="user2",
+                password="pass2",
+                is_test=True
+            )
+            messenger3._connect()
+            self.assertEqual(mock_socket.call_count, 2)
+            messenger3._disconnect()
             
     def test_token_cache(self):
         """Test token caching and validation."""
@@ -83,37 +121,52 @@ class TestDirectMessengerCoverage(unittest.TestCase):
             }
         }
         
-        # Mock _receive to return auth response
-        self.messenger._receive = Mock(return_value=json.dumps(auth_response))
+        # Mock _receive to return the auth response dict directly;
+        # extract_json accepts pre-parsed objects
+        self.messenger._receive = Mock(return_value=auth_response)
         
         # First authentication
         self.assertTrue(self.messenger._authenticate())
         self.assertEqual(self.messenger.token, "test-token")
         
         # Verify token is cached
-        with patch('time.time', return_value=time.time() + 1000):  # Within 24h
+        with patch('time.time', return_value=_NOW + 1000):  # Within 24h
             self.assertTrue(self.messenger._is_token_valid())
             self.assertEqual(self.messenger.token, "test-token")
             
         # Expired token
-        with patch('time.time', return_value=time.time() + 86401):  # >24h
+        with patch('time.time', return_value=_NOW + 86401):  # >24h
             self.assertFalse(self.messenger._is_token_valid())
             
     def test_error_handling(self):
         """Test error handling in socket operations."""
+        # Make sure no pooled entry left by another test can satisfy
+        # the connect; nothing listens on this port, so it must fail
+        self.messenger._connection_pool.evict(
+            self.messenger.dsuserver, self.messenger.port,
+            self.messenger.username)
+
         # Test connection error
         with self.assertRaises(ConnectionError):
             self.messenger._connect()
-            
+
+        # The send/receive error paths are bypassed in test mode, so
+        # drop back to the real transport for the rest of the test
+        self.messenger._is_test = False
+        self.addCleanup(setattr, self.messenger, '_is_test', True)
+
         # Test send error
         self.messenger.connected = True
         self.messenger.socket = Mock()
         self.messenger.socket.sendall.side_effect = socket.error
         with self.assertRaises(ConnectionError):
             self.messenger._send("test message")
-            
-        # Test receive error
-        self.messenger._receive = Mock(side_effect=socket.error)
+
+        # Test receive error: the buffered reader blows up mid-read
+        self.messenger.connected = True
+        self.messenger.socket = Mock()
+        reader = self.messenger.socket.makefile.return_value
+        reader.readline.side_effect = socket.error
         with self.assertRaises(ConnectionError):
             self.messenger._receive()
             
@@ -143,6 +196,19 @@ class TestDirectMessengerCoverage(unittest.TestCase):
         messages = self.messenger._parse_messages(invalid_messages)
         self.assertEqual(len(messages), 0)
         
+    def test_bulk_message_parsing(self):
+        """Parse a large batch in one call without drops or errors."""
+        batch = [
+            {"message": f"msg {i}", "from": "user1",
+             "timestamp": 1234567890.0 + i}
+            for i in range(10_000)
+        ]
+        messages = self.messenger._parse_messages(batch)
+        self.assertEqual(len(messages), 10_000)
+        self.assertEqual(messages[0].message, "msg 0")
+        self.assertEqual(messages[-1].message, "msg 9999")
+        self.assertEqual(messages[-1].timestamp, 1234567890.0 + 9999)
+
     def test_thread_safety(self):
         """Test thread safety of operations."""
         import threading
@@ -152,27 +218,22 @@ class TestDirectMessengerCoverage(unittest.TestCase):
             messenger = DirectMessenger(
                 dsuserver="localhost",
                 port=3001,
-                username="user" + str(threading.get_ident()),
+                username="pooluser",
                 password="pass",
                 is_test=True
             )
             messenger._connect()
             return messenger
-        
-        # Create multiple threads
-        threads = []
-        results = []
-        
-        for _ in range(5):
-            t = threading.Thread(target=lambda: results.append(connect_messenger()))
-            threads.append(t)
-            t.start()
-        
-        # Wait for all threads
-        for t in threads:
-            t.join()
-            
-        # Verify all threads got the same instance
+
+        # Run the connects from the class-level executor; no real
+        # server is listening, so socket creation is mocked for the
+        # duration of the race
+        with patch('socket.socket', autospec=False):
+            results = list(self._executor.map(
+                lambda _: connect_messenger(), range(5)))
+
+
+        # Same identity from every thread: one instance
         first_messenger = results[0]
         for messenger in results[1:]:
             self.assertIs(messenger, first_messenger)
@@ -1,5 +1,4 @@
 import unittest
-import json
 import time
 from unittest.mock import patch
 from ds_protocol import (
@@ -17,11 +16,17 @@ from ds_protocol import (
 class TestDSPProtocol(unittest.TestCase):
     """Test cases for the DSP protocol implementation."""
 
+    # The formatters emit compact JSON with insertion-ordered keys, so
+    # the expected values below are exact canonical bytes; comparing
+    # them directly skips a json.loads round trip per assertion and
+    # also catches key-ordering or whitespace regressions.
+
     def test_format_auth_message(self):
         """Test formatting authentication message."""
         result = format_auth_message("testuser", "testpass")
-        expected = ('{"authenticate": {\n    "username": "testuser",\n    "password": "testpass"\n}}')
-        self.assertEqual(json.loads(result), json.loads(expected))
+        expected = (b'{"authenticate":{"username":"testuser",'
+                    b'"password":"testpass"}}')
+        self.assertEqual(result, expected)
 
     def test_format_direct_message(self):
         """Test formatting direct message."""
@@ -29,18 +34,19 @@ class TestDSPProtocol(unittest.TestCase):
             result = format_direct_message(
                 "test-token", "recipient", "Hello"
             )
-            expected = ('{\n    "token": "test-token",\n    "directmessage": {\n        "message": "Hello",\n        "recipient": "recipient",\n        "timestamp": 1234567890.0\n    }\n}')
-            self.assertEqual(json.loads(result), json.loads(expected))
+            expected = (b'{"token":"test-token","directmessage":'
+                        b'{"message":"Hello","recipient":"recipient",'
+                        b'"timestamp":1234567890.0}}')
+            self.assertEqual(result, expected)
 
     def test_format_fetch_request(self):
         """Test formatting fetch request"""
         result = format_fetch_request("test-token", "all")
-        expected = '{"token": "test-token", "fetch": "all"}'
-        self.assertEqual(json.loads(result), json.loads(expected))
-        
+        self.assertEqual(result, b'{"token":"test-token","fetch":"all"}')
+
         result = format_fetch_request("test-token", "unread")
-        expected = '{"token": "test-token", "fetch": "unread"}'
-        self.assertEqual(json.loads(result), json.loads(expected))
+        self.assertEqual(
+            result, b'{"token":"test-token","fetch":"unread"}')
         
         with self.assertRaises(DSPProtocolError):
             format_fetch_request("test-token", "invalid")